@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+"""
+gunicorn settings for the web process (`gunicorn main:app`).
+The Telegram poller runs separately as `python main.py bot`.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+
+def _default_workers():
+    # CPUs this process may run on (respects cpusets/affinity), capped so a
+    # container on a big host doesn't start dozens of workers
+    try:
+        return min(len(os.sched_getaffinity(0)), 4)
+    except AttributeError:
+        return 2
+
+
+# one worker per usable core (at most 4) unless the platform sets WEB_CONCURRENCY
+workers = int(os.environ.get("WEB_CONCURRENCY") or _default_workers())
+worker_class = "gthread"
+threads = 8
+
+
+def post_worker_init(worker):
+    # each worker sends its own order notifications to the group
+    import main
+    main.start_notifier()
@@ -8,42 +8,87 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import re
 import json
-import datetime
+import sys
 import threading
 import asyncio
 import uuid
 import time
+import math
+import shutil
+import queue
+import atexit
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.request import urlretrieve
+from urllib.request import urlopen
+import jinja2
 from flask import (
-    Flask, render_template, request, send_from_directory,
-    redirect, url_for, session, jsonify
+    Flask, Blueprint, render_template, request,
+    redirect, url_for, session, jsonify, g, has_request_context
 )
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Optional fast JSON (falls back to stdlib json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional file locking (POSIX only)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # Optional Telegram
 try:
-    from aiogram import Bot, Dispatcher, types
+    from aiogram import Bot, Dispatcher, F, types
     from aiogram.filters import Command
     from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.client.session.aiohttp import AiohttpSession
 except Exception:
     Bot = None
     Dispatcher = None
+    F = None
     types = None
     Command = None
     MemoryStorage = None
+    AiohttpSession = None
+
+# Optional faster event loop for the bot / ASGI server
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+# Optional ASGI server for running web + bot on one event loop
+try:
+    import uvicorn
+    from a2wsgi import WSGIMiddleware
+except Exception:
+    uvicorn = None
+    WSGIMiddleware = None
 
 BASE = Path(__file__).parent
-DB_FILE = BASE / "database.json"
+PRODUCTS_FILE = BASE / "products.json"
+ADMINS_FILE = BASE / "admins.json"
+LEGACY_DB_FILE = BASE / "database.json"
+ORDERS_FILE = BASE / "orders.jsonl"
+MIGRATE_LOCK = BASE / ".migrate.lock"
 TEMPLATES = BASE / "templates"
+JINJA_CACHE = BASE / ".jinja_cache"
 STATIC = BASE / "static"
 IMAGES = STATIC / "images"
 
-# Ensure folders
-TEMPLATES.mkdir(exist_ok=True)
-STATIC.mkdir(exist_ok=True)
-IMAGES.mkdir(parents=True, exist_ok=True)
+# templates/, static/images/, products.json and admins.json ship with the repo
+assert (TEMPLATES / "index.html").exists(), f"templates missing in {TEMPLATES}"
 
 # Env / config
 BOT_TOKEN = os.environ.get("BOT_TOKEN") or ""
@@ -56,176 +101,520 @@ except Exception:
     ORDER_GROUP_ID = None
 
 WEB_URL = os.environ.get("WEB_URL") or ""
+TELEGRAM_POOL_LIMIT = 64
+TELEGRAM_TEXT_LIMIT = 4096
+NOTIFY_BATCH_SIZE = 10
+WSGI_THREADS = 8
 SECRET_KEY = os.environ.get("SECRET_KEY", "change-me")
 
 ALLOWED_EXT = {"png", "jpg", "jpeg", "gif"}
+_ALLOWED_LANGS = frozenset(("uz", "ru"))
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+# Order timestamps (local time, second precision)
+ORDER_TIME_FMT = "%Y-%m-%dT%H:%M:%S"
+_now = time.strftime
+
+# --- Storage helpers (simple JSON files) ---
+def _dumps(obj, indent=False):
+    """Serialize to UTF-8 JSON bytes."""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _dump(path, obj):
+    # one buffered write to a per-writer temp file, then swap it in so readers
+    # never see a half-written file and concurrent writers never share one
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb", buffering=1 << 20) as f:
+        f.write(_dumps(obj, indent=True))
+    os.replace(tmp, path)
+
+
+# Parsed files, reloaded only when the file's mtime changes. "snapshot" is
+# (mtime, list, index) with index mapping "key" -> item; it is replaced as a
+# whole so readers never pair a list with another version's mtime or index.
+_PRODUCTS_CACHE = {"snapshot": (None, None, {}), "key": "id"}
+_ADMINS_CACHE = {"snapshot": (None, None, {}), "key": "username"}
+_EMPTY_SNAPSHOT = (None, [], {})
+_CACHE_LOCK = threading.Lock()
 
-# --- Database helpers (simple JSON) ---
-def ensure_db():
-    if not DB_FILE.exists():
-        sample = {
-            "products": [
-                {
-                    "id": "p1",
-                    "name_uz": "Go'shtli chuchvara — 1 kg",
-                    "name_ru": "Пельмени с говядиной — 1 кг",
-                    "price": 45000,
-                    "image": "images/chuchvara_beef_1kg.jpg",
-                    "desc_uz": "Yuqori sifatli mol go‘shtidan tayyorlangan.",
-                    "desc_ru": "Приготовлены из высококачественной говядины."
-                }
-            ],
-            "orders": [],
-            "admins": [{"username": "admin", "password": "12345"}]
-        }
-        DB_FILE.write_text(json.dumps(sample, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
-def read_db():
-    ensure_db()
+
+def _load_cached(path, cache):
+    # fast path: unchanged file, no lock
+    snapshot = cache["snapshot"]
     try:
-        with DB_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {"products": [], "orders": [], "admins": []}
+        if snapshot[0] == path.stat().st_mtime_ns:
+            return snapshot
+    except OSError:
+        pass
+    with _CACHE_LOCK:
+        try:
+            mtime = path.stat().st_mtime_ns
+            snapshot = cache["snapshot"]
+            if snapshot[0] == mtime:
+                return snapshot
+            data = _loads(path.read_bytes())
+        except Exception:
+            return _EMPTY_SNAPSHOT
+        snapshot = (mtime, data, {x.get(cache["key"]): x for x in data})
+        cache["snapshot"] = snapshot
+        return snapshot
+
+
+def _products_snapshot():
+    # parse at most once per request; outside requests go straight to the cache
+    if not has_request_context():
+        return _load_cached(PRODUCTS_FILE, _PRODUCTS_CACHE)
+    if "_products" not in g:
+        g._products = _load_cached(PRODUCTS_FILE, _PRODUCTS_CACHE)
+    return g._products
+
+
+def read_products():
+    return _products_snapshot()[1]
+
+
+def write_products(products):
+    _dump(PRODUCTS_FILE, products)
+    if has_request_context():
+        g._products = (None, products, {p.get("id"): p for p in products})
+
+
+def read_admins():
+    return _load_cached(ADMINS_FILE, _ADMINS_CACHE)[1]
+
+# --- Orders (append-only JSON lines) ---
+# Orders are queued and written by a background flusher in batches of up
+# to ORDER_BATCH_SIZE, or whatever arrived within ORDER_BATCH_WAIT seconds.
+ORDER_BATCH_SIZE = 64
+ORDER_BATCH_WAIT = 0.2
+
+_ORDERS_LOCK = threading.Lock()
+_ORDER_WRITE_Q = queue.Queue()
+
+
+def _write_orders(batch):
+    data = b"".join(_dumps(o) + b"\n" for o in batch)
+    with _ORDERS_LOCK:
+        with ORDERS_FILE.open("ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _order_flusher():
+    stop = False
+    while not stop:
+        item = _ORDER_WRITE_Q.get()
+        if item is None:
+            return
+        batch = [item]
+        deadline = time.monotonic() + ORDER_BATCH_WAIT
+        while len(batch) < ORDER_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = _ORDER_WRITE_Q.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        try:
+            _write_orders(batch)
+        except Exception as e:
+            print("Failed to write orders:", e)
+
+
+_ORDER_FLUSHER = threading.Thread(target=_order_flusher, daemon=True)
+_ORDER_FLUSHER.start()
+
+
+@atexit.register
+def _stop_order_flusher():
+    # write out anything still queued before the process exits
+    _ORDER_WRITE_Q.put(None)
+    _ORDER_FLUSHER.join(timeout=5)
 
 
-def write_db(data):
-    with DB_FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def append_order(order):
+    _ORDER_WRITE_Q.put(order)
+
+
+def read_orders():
+    orders = []
+    try:
+        with ORDERS_FILE.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    orders.append(_loads(line))
+    except FileNotFoundError:
+        pass
+    return orders
+
+
+def _parse_qty(value):
+    """Quantity as a finite positive float, 1.0 if it isn't one."""
+    try:
+        qty = float(value)
+    except (TypeError, ValueError):
+        return 1.0
+    return qty if math.isfinite(qty) and qty > 0 else 1.0
+
+
+def _parse_price(value):
+    """Price in whole so'm, or None if it isn't a finite number."""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(price) if math.isfinite(price) else None
+
+
+# Running totals over orders.jsonl; "offset" is how far the file has been read
+_ORDER_STATS = {"offset": 0, "count": 0, "qty": 0.0, "sum": 0.0}
+_STATS_LOCK = threading.Lock()
+
+
+def order_stats():
+    """Return order totals, parsing only lines appended since the last call."""
+    with _STATS_LOCK:
+        st = _ORDER_STATS
+        try:
+            with ORDERS_FILE.open("rb") as f:
+                if os.fstat(f.fileno()).st_size < st["offset"]:
+                    # file was replaced or truncated; start over
+                    st.update(offset=0, count=0, qty=0.0, sum=0.0)
+                f.seek(st["offset"])
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written; picked up on the next call
+                    st["offset"] += len(line)
+                    if not line.strip():
+                        continue
+                    # new_order() stores qty and price as numbers; skip
+                    # anything else (hand-edited or foreign lines)
+                    try:
+                        o = _loads(line)
+                        qty, price = o["qty"], o["price"]
+                    except (ValueError, TypeError, KeyError):
+                        continue
+                    if not (isinstance(qty, (int, float)) and isinstance(price, (int, float))):
+                        continue
+                    st["count"] += 1
+                    st["qty"] += qty
+                    st["sum"] += qty * price
+        except FileNotFoundError:
+            pass
+        return {"count": st["count"], "qty": st["qty"], "sum": st["sum"]}
+
+
+def migrate_legacy_db():
+    """Split database.json from older versions into products/admins/orders files."""
+    try:
+        db = _loads(LEGACY_DB_FILE.read_bytes())
+    except FileNotFoundError:
+        return
+    # the deployment's own data replaces the defaults shipped with the repo
+    if "products" in db:
+        _dump(PRODUCTS_FILE, db["products"])
+    if "admins" in db:
+        _dump(ADMINS_FILE, db["admins"])
+    if db.get("orders"):
+        # old versions stored qty/price as strings; store numbers like new_order()
+        _write_orders([
+            dict(o, qty=_parse_qty(o.get("qty", 1)), price=_parse_price(o.get("price")) or 0)
+            for o in db["orders"] if isinstance(o, dict)
+        ])
+    LEGACY_DB_FILE.rename(BASE / "database.json.bak")
+
+
+def hash_admin_passwords():
+    """Replace plaintext admin passwords with password hashes."""
+    admins = read_admins()
+    if not any("password" in a for a in admins):
+        return
+    updated = []
+    for a in admins:
+        a = dict(a)
+        if "password" in a:
+            a["password_hash"] = generate_password_hash(a.pop("password"))
+        updated.append(a)
+    _dump(ADMINS_FILE, updated)
+
+
+def run_migrations():
+    """Run the one-shot migrations; gunicorn workers importing at once take turns."""
+    with MIGRATE_LOCK.open("ab") as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        # each migration re-checks the files, so later workers find nothing to do
+        migrate_legacy_db()
+        hash_admin_passwords()
+run_migrations()
 
 # --- Utils ---
 def find_product(pid):
-    db = read_db()
-    for p in db.get("products", []):
-        if p.get("id") == pid:
-            return p
-    return None
+    return _products_snapshot()[2].get(pid)
+
+
+def find_admin(username):
+    return _load_cached(ADMINS_FILE, _ADMINS_CACHE)[2].get(username)
 
 
 def generate_id(prefix="p"):
     return prefix + uuid.uuid4().hex[:8]
 
 
+_secure = lru_cache(maxsize=1024)(secure_filename)
+
+
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
 # Create placeholder images if missing
+def _fetch_placeholder(item):
+    p, path = item
+    try:
+        url = f"https://via.placeholder.com/800x400?text={p.get('id')}"
+        with urlopen(url, timeout=10) as r:
+            data = r.read()
+    except Exception:
+        data = b""
+    # other workers may be fetching the same image: write aside, then link it
+    # into place, which fails instead of overwriting a file that now exists
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(data)
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        print("Placeholder image error:", e)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
 def ensure_sample_images():
-    db = read_db()
-    for p in db.get("products", []):
-        img = p.get("image")
-        if img:
-            path = IMAGES / img
-            if not path.exists():
-                try:
-                    path.parent.mkdir(parents=True, exist_ok=True)
-                    urlretrieve(f"https://via.placeholder.com/800x400?text={p.get('id')}", str(path))
-                except Exception:
-                    path.write_text("", encoding="utf-8")
-ensure_sample_images()
+    # product images are stored relative to the static folder ("images/...")
+    missing = [
+        (p, STATIC / p["image"]) for p in read_products()
+        if p.get("image") and not (STATIC / p["image"]).exists()
+    ]
+    if not missing:
+        return
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(_fetch_placeholder, missing))
+# fetch in the background so startup (and health checks) never wait on the network
+threading.Thread(target=ensure_sample_images, daemon=True).start()
 
 # --- Flask app and routes ---
+class OrjsonProvider(JSONProvider):
+    """Serve jsonify() responses through orjson.
+
+    Calls with options orjson doesn't have (e.g. the session serializer's
+    object_hook) go to the stdlib json module.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return json.dumps(obj, **kwargs)
+        return _dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return _loads(s)
+
+
 app = Flask(__name__, template_folder=str(TEMPLATES), static_folder=str(STATIC))
 app.secret_key = SECRET_KEY
+if orjson:
+    app.json = OrjsonProvider(app)
+# Let browsers/CDN keep static images for 30 days
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 2592000
+# Werkzeug enforces this while reading the body, chunked uploads included
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_SIZE
+
+# Keep compiled templates on disk and skip per-render mtime checks outside development
+JINJA_CACHE.mkdir(exist_ok=True)
+app.jinja_env.bytecode_cache = jinja2.FileSystemBytecodeCache(directory=str(JINJA_CACHE), pattern="%s.cache")
+if os.environ.get("FLASK_ENV") != "development":
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    app.jinja_env.auto_reload = False
+
+# Relative URLs depend only on (endpoint, values), so templates share one cache
+_cached_url_for = lru_cache(maxsize=4096)(app.url_for)
+
+
+def _template_url_for(endpoint, **values):
+    if values.get("_external"):
+        return app.url_for(endpoint, **values)
+    return _cached_url_for(endpoint, **values)
+
+
+app.jinja_env.globals["url_for"] = _template_url_for
+
+
+# Compile every template once at startup instead of on first request
+for _tpl in app.jinja_env.list_templates():
+    app.jinja_env.get_template(_tpl)
+
+
+@app.teardown_request
+def _drop_request_products(exc):
+    g.pop("_products", None)
+
+# Uploaded images get a unique "<8 hex>_" prefix, so their URLs never change content
+_UPLOADED_IMAGE = re.compile(r"^/static/images/[0-9a-f]{8}_")
+
+@app.after_request
+def _static_cache_headers(response):
+    if response.status_code == 200 and _UPLOADED_IMAGE.match(request.path):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+# Rendered menu pages: (lang, base_url) -> (products mtime, html)
+_INDEX_CACHE = {}
+_INDEX_CACHE_MAX = 64
 
 @app.route("/")
 def index():
     lang = request.args.get("lang", "ru")
-    db = read_db()
-    products = db.get("products", [])
+    if lang not in _ALLOWED_LANGS:
+        lang = "ru"
+    mtime, products, _ = _products_snapshot()
     base_url = WEB_URL if WEB_URL else request.host_url.rstrip("/")
-    return render_template("index.html", products=products, lang=lang, web_url=base_url)
+    key = (lang, base_url)
+    cached = _INDEX_CACHE.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    html = render_template("index.html", products=products, lang=lang, web_url=base_url)
+    if mtime is None:
+        return html  # unreadable or just-written file: nothing to key the page on
+    if len(_INDEX_CACHE) >= _INDEX_CACHE_MAX:
+        _INDEX_CACHE.clear()
+    _INDEX_CACHE[key] = (mtime, html)
+    return html
+
+def _text_field(fields, key, default):
+    # JSON bodies may send null, numbers or objects; keep only strings
+    value = fields.get(key, default)
+    return value if isinstance(value, str) else default
+
+
+def new_order(product, lang, fields):
+    """Build an order record from submitted fields (form or JSON)."""
+    qty = _parse_qty(fields.get("qty", "1"))
+    price = _parse_price(product.get("price", 0))
+    if price is None:
+        print("Invalid price for product", product.get("id"), repr(product.get("price")))
+        price = 0
+    name_key = "name_uz" if lang == "uz" else "name_ru"
+    return {
+        "id": "o" + uuid.uuid4().hex[:8],
+        "product_id": product.get("id"),
+        "product_name": product.get(name_key) or product.get("name_ru"),
+        "price": price,
+        "qty": qty,
+        "name": _text_field(fields, "name", "Anonim"),
+        "phone": _text_field(fields, "phone", ""),
+        "note": _text_field(fields, "note", ""),
+        "time": _now(ORDER_TIME_FMT)
+    }
+
+
+def place_order(order):
+    append_order(order)
+
+    # hand off to the telegram worker on the bot loop
+    try:
+        loop = AIOLOOP
+        if loop is not None:
+            loop.call_soon_threadsafe(_enqueue_order, order)
+    except Exception as e:
+        print("Telegram send error:", e)
 
 @app.route("/order/<product_id>", methods=["GET", "POST"])
 def order(product_id):
-    lang = request.args.get("lang", request.form.get("lang", "ru"))
     product = find_product(product_id)
     if not product:
         return "Mahsulot topilmadi", 404
 
-    if request.method == "POST":
-        name = request.form.get("name", "Anonim")
-        phone = request.form.get("phone", "")
-        try:
-            qty = float(request.form.get("qty", "1"))
-        except:
-            qty = 1.0
-        note = request.form.get("note", "")
-
-        order = {
-            "id": "o" + uuid.uuid4().hex[:8],
-            "product_id": product_id,
-            "product_name": product.get(f"name_{lang}", product.get("name_ru")),
-            "price": product.get("price", 0),
-            "qty": qty,
-            "name": name,
-            "phone": phone,
-            "note": note,
-            "time": datetime.datetime.now().isoformat()
-        }
-
-        db = read_db()
-        db["orders"].append(order)
-        write_db(db)
-
-        # send async telegram
-        try:
-            if globals().get("aioloop"):
-                asyncio.run_coroutine_threadsafe(
-                    send_order_to_group_async(order), globals()["aioloop"]
-                )
-        except Exception as e:
-            print("Telegram send error:", e)
+    form = request.form
+    lang = request.args.get("lang") or form.get("lang", "ru")
+    if lang not in _ALLOWED_LANGS:
+        lang = "ru"
 
+    if request.method == "POST":
+        order = new_order(product, lang, form)
+        place_order(order)
         return render_template("ordered.html", order=order, lang=lang)
 
     return render_template("order.html", product=product, lang=lang)
 
-@app.route("/static/<path:filename>")
-def static_files(filename):
-    return send_from_directory(str(STATIC), filename)
-
 # --- Admin ---
-@app.route("/admin/login", methods=["GET", "POST"])
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+@admin_bp.before_request
+def require_admin():
+    if not session.get("admin") and request.endpoint != "admin.admin_login":
+        return redirect(url_for("admin.admin_login"))
+
+def _dummy_password_hash():
+    # same method and cost as a real admin hash, but matches no password
+    admins = read_admins()
+    real = admins[0].get("password_hash", "") if admins else ""
+    method = real.split("$", 1)[0] if "$" in real else "pbkdf2:sha256"
+    return f"{method}$dummy${'0' * 64}"
+
+@admin_bp.route("/login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         username = request.form.get("username", "")
         password = request.form.get("password", "")
-        db = read_db()
-        for a in db.get("admins", []):
-            if a["username"] == username and a["password"] == password:
-                session["admin"] = username
-                return redirect(url_for("admin_panel"))
+        a = find_admin(username)
+        # hash even for unknown users so timing doesn't reveal which ones exist
+        pwhash = a.get("password_hash", "") if a else _dummy_password_hash()
+        ok = check_password_hash(pwhash, password)
+        if a and ok:
+            session["admin"] = username
+            return redirect(url_for("admin.admin_panel"))
         return render_template("login.html", error="Invalid credentials")
     return render_template("login.html", error=None)
 
-@app.route("/admin/logout")
+@admin_bp.route("/logout")
 def admin_logout():
     session.pop("admin", None)
-    return redirect(url_for("admin_login"))
-
-def admin_required(f):
-    def wrap(*a, **kw):
-        if not session.get("admin"):
-            return redirect(url_for("admin_login"))
-        return f(*a, **kw)
-    wrap.__name__ = f.__name__
-    return wrap
-
-@app.route("/admin")
-@admin_required
+    return redirect(url_for("admin.admin_login"))
+
+@admin_bp.route("")
 def admin_panel():
     lang = request.args.get("lang", "ru")
-    db = read_db()
-    return render_template("admin.html", products=db["products"], orders=db["orders"], lang=lang)
+    _, products, prod_by_id = _products_snapshot()
+    return render_template(
+        "admin.html", products=products, prod_by_id=prod_by_id, orders=read_orders(), lang=lang
+    )
+
+app.register_blueprint(admin_bp)
 
 # --- API endpoints ---
 @app.route("/api/products", methods=["GET", "POST"])
 def api_products():
     if request.method == "GET":
-        db = read_db()
-        return jsonify(db["products"])
+        return jsonify(read_products())
 
     if not session.get("admin"):
         return jsonify({"error": "auth required"}), 403
@@ -242,39 +631,69 @@ def api_products():
         "desc_ru": data.get("desc_ru", "")
     }
 
-    db = read_db()
-    db["products"].append(product)
-    write_db(db)
+    write_products(read_products() + [product])
     return jsonify(product), 201
 
+@app.route("/api/order", methods=["POST"])
+def api_order():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "invalid body"}), 400
+    product_id = data.get("product_id")
+    if not isinstance(product_id, str):
+        return jsonify({"error": "invalid product_id"}), 400
+    product = find_product(product_id)
+    if not product:
+        return jsonify({"error": "product not found"}), 404
+    lang = data.get("lang", "ru")
+    if not isinstance(lang, str) or lang not in _ALLOWED_LANGS:
+        lang = "ru"
+    order = new_order(product, lang, data)
+    place_order(order)
+    return jsonify(order), 201
+
 @app.route("/api/upload", methods=["POST"])
 def api_upload():
     if not session.get("admin"):
         return jsonify({"error": "auth required"}), 403
-    if "file" not in request.files:
+    try:
+        f = request.files.get("file")
+    except RequestEntityTooLarge:
+        return jsonify({"error": "file too large"}), 413
+    if f is None:
         return jsonify({"error": "no file"}), 400
 
-    f = request.files["file"]
     if f.filename == "":
         return jsonify({"error": "empty filename"}), 400
     if not allowed_file(f.filename):
         return jsonify({"error": "invalid file type"}), 400
 
-    filename = secure_filename(f.filename)
+    filename = _secure(f.filename)
     filename = f"{uuid.uuid4().hex[:8]}_{filename}"
     save_path = IMAGES / filename
-    f.save(str(save_path))
+    with open(save_path, "wb") as dest:
+        shutil.copyfileobj(f.stream, dest, length=65536)
     return jsonify({
         "filename": filename,
         "url": f"images/{filename}"
     }), 201
 
 # --- Telegram setup ---
+if AiohttpSession:
+    class PooledAiohttpSession(AiohttpSession):
+        """One long-lived HTTP session whose connections are kept alive and reused."""
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self._connector_init.update(
+                limit=TELEGRAM_POOL_LIMIT, ttl_dns_cache=300, keepalive_timeout=75
+            )
+
 bot = None
 dp = None
 if BOT_TOKEN and Bot:
     try:
-        bot = Bot(token=BOT_TOKEN)
+        bot = Bot(token=BOT_TOKEN, session=PooledAiohttpSession())
         storage = MemoryStorage() if MemoryStorage else None
         dp = Dispatcher(storage=storage)
     except Exception as e:
@@ -282,26 +701,74 @@ if BOT_TOKEN and Bot:
         bot = None
         dp = None
 
+# Every key is set when the order is created in new_order()
+_ORDER_TEMPLATE = (
+    "🆕 Yangi buyurtma\n"
+    "Mahsulot: {product_name}\n"
+    "Miqdor: {qty}\n"
+    "Ism: {name}\n"
+    "Tel: {phone}\n"
+    "Izoh: {note}\n"
+    "Vaqt: {time}"
+)
+
+
 def build_text(o):
-    return (
-        f"🆕 Yangi buyurtma\n"
-        f"Mahsulot: {o['product_name']}\n"
-        f"Miqdor: {o['qty']}\n"
-        f"Ism: {o['name']}\n"
-        f"Tel: {o['phone']}\n"
-        f"Izoh: {o['note']}\n"
-        f"Vaqt: {o['time']}"
-    )
+    return _ORDER_TEMPLATE.format_map(o)
 
-async def send_order_to_group_async(order):
-    if not bot:
+async def send_orders_to_group_async(orders):
+    """Send orders to the group, several per message where they fit."""
+    if not bot or not ORDER_GROUP_ID:
         return
-    if ORDER_GROUP_ID:
+    messages = []
+    for text in map(build_text, orders):
+        if messages and len(messages[-1]) + 2 + len(text) <= TELEGRAM_TEXT_LIMIT:
+            messages[-1] += "\n\n" + text
+        else:
+            messages.append(text)
+    for text in messages:
         try:
-            await bot.send_message(ORDER_GROUP_ID, build_text(order))
+            await bot.send_message(ORDER_GROUP_ID, text)
         except Exception as e:
             print("Failed to send order to group:", e)
 
+_REPORT_TEMPLATE = (
+    "📊 Hisobot\n"
+    "Buyurtmalar: {count}\n"
+    "Jami miqdor: {qty:,.2f}\n"
+    "Jami summa: {sum:,.0f} so'm"
+)
+
+# Loop running the telegram worker, and the orders waiting for it
+AIOLOOP = None
+ORDER_Q = None
+
+
+def _enqueue_order(order):
+    try:
+        ORDER_Q.put_nowait(order)
+    except asyncio.QueueFull:
+        print("Order queue full, notification dropped:", order.get("id"))
+
+
+async def _telegram_worker():
+    while True:
+        # take whatever else is already waiting, up to NOTIFY_BATCH_SIZE
+        batch = [await ORDER_Q.get()]
+        while len(batch) < NOTIFY_BATCH_SIZE and not ORDER_Q.empty():
+            batch.append(ORDER_Q.get_nowait())
+        await send_orders_to_group_async(batch)
+        for _ in batch:
+            ORDER_Q.task_done()
+
+
+async def _bot_main(handle_signals=True):
+    worker = asyncio.create_task(_telegram_worker())
+    try:
+        await dp.start_polling(bot, handle_signals=handle_signals)
+    finally:
+        worker.cancel()
+
 if dp and types:
     @dp.message(Command("start"))
     async def start_cmd(m: types.Message):
@@ -316,27 +783,94 @@ if dp and types:
         markup = types.InlineKeyboardMarkup(inline_keyboard=kb)
         await m.answer("Добро пожаловать", reply_markup=markup)
 
+    # only the order group may ask; other chats are filtered out by aiogram
+    @dp.message(Command("report"), F.chat.id == ORDER_GROUP_ID)
+    async def report_cmd(m: types.Message):
+        stats = await asyncio.to_thread(order_stats)
+        await m.answer(_REPORT_TEMPLATE.format_map(stats))
+
 # --- Run server + bot ---
+# Production: gunicorn serves `main:app` (see gunicorn.conf.py) and
+# `python main.py bot` runs the poller as its own process.
+# Plain `python main.py` runs both on one event loop via uvicorn.
 def run_flask():
+    # development server, fallback when uvicorn/a2wsgi are missing
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, threaded=True)
 
+async def _serve_all():
+    port = int(os.environ.get("PORT", 5000))
+    # Flask requests run on a pool of WSGI_THREADS threads, off the event loop
+    asgi_app = WSGIMiddleware(app, workers=WSGI_THREADS)
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="0.0.0.0", port=port, lifespan="off"))
+    bot_task = None
+    if dp and bot:
+        # uvicorn owns SIGINT/SIGTERM; polling is cancelled once it stops
+        bot_task = asyncio.create_task(_bot_main(handle_signals=False))
+    try:
+        await server.serve()
+    finally:
+        if bot_task:
+            bot_task.cancel()
+
+def run_all():
+    if dp and bot:
+        aioloop = _new_bot_loop()
+        print("Starting web server and aiogram polling...")
+    else:
+        aioloop = asyncio.new_event_loop()
+        asyncio.set_event_loop(aioloop)
+        print("Web only mode (Telegram disabled).")
+    try:
+        aioloop.run_until_complete(_serve_all())
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    except Exception as e:
+        print("Server stopped:", e)
+
+def _new_bot_loop():
+    global AIOLOOP, ORDER_Q
+    aioloop = asyncio.new_event_loop()
+    asyncio.set_event_loop(aioloop)
+    ORDER_Q = asyncio.Queue(maxsize=1000)
+    AIOLOOP = aioloop
+    return aioloop
+
+def run_notifier_loop():
+    aioloop = _new_bot_loop()
+    try:
+        aioloop.run_until_complete(_telegram_worker())
+    except Exception as e:
+        print("Notifier stopped:", e)
+
+def start_notifier():
+    """Send order notifications from a web worker that does not poll."""
+    if not bot or not ORDER_GROUP_ID:
+        return
+    threading.Thread(target=run_notifier_loop, daemon=True).start()
+
 def run_bot_loop():
     if not dp or not bot:
         print("Bot not configured or aiogram missing. Running web only.")
         return
 
-    aioloop = asyncio.new_event_loop()
-    asyncio.set_event_loop(aioloop)
-    globals()["aioloop"] = aioloop
+    aioloop = _new_bot_loop()
 
     print("Starting aiogram polling...")
     try:
-        aioloop.run_until_complete(dp.start_polling(bot))
+        aioloop.run_until_complete(_bot_main())
     except Exception as e:
         print("Polling stopped:", e)
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["bot"]:
+        run_bot_loop()
+        sys.exit(0)
+
+    if uvicorn:
+        run_all()
+        sys.exit(0)
+
     flask_thread = threading.Thread(target=run_flask, daemon=True)
     flask_thread.start()
     print("Flask started.")
@@ -350,281 +884,3 @@ if __name__ == "__main__":
             print("Shutting down.")
     else:
         run_bot_loop()
-```
-
----
-
-## File: `requirements.txt`
-
-```
-Flask>=2.0
-aiogram==3.4.1
-aiohttp>=3.8
-python-dotenv>=1.0
-gunicorn>=21.2
-Werkzeug>=2.0
-```
-
----
-
-## File: `Procfile`
-
-```
-web: gunicorn --bind 0.0.0.0:$PORT main:app
-worker: python main.py
-```
-
----
-
-## File: `runtime.txt`
-
-```
-python-3.11.16
-```
-
----
-
-## File: `.gitignore`
-
-```
-.env
-__pycache__/
-*.pyc
-.vscode/
-instance/
-```
-
----
-
-## File: `database.json` (expanded — 9 products)
-
-```json
-{
-  "products": [
-    {
-      "id": "p1",
-      "name_uz": "Go'shtli chuchvara — 1 kg",
-      "name_ru": "Пельмени с говядиной — 1 кг",
-      "price": 45000,
-      "image": "images/chuchvara_beef_1kg.jpg",
-      "desc_uz": "Yuqori sifatli mol go‘shtidan tayyorlangan.",
-      "desc_ru": "Приготовлены из высококачественной говядины."
-    },
-    {
-      "id": "p2",
-      "name_uz": "Tovuqli chuchvara — 1 kg",
-      "name_ru": "Пельмени с курицей — 1 кг",
-      "price": 33000,
-      "image": "images/chuchvara_chicken_1kg.jpg",
-      "desc_uz": "Yengil va mazali tovuq go‘shtidan tayyorlangan.",
-      "desc_ru": "Нежные и вкусные пельмени с курицей."
-    },
-    {
-      "id": "p3",
-      "name_uz": "Tovuqli chuchvara — 500 g",
-      "name_ru": "Пельмени с курицей — 500 г",
-      "price": 17500,
-      "image": "images/chuchvara_chicken_500g.jpg",
-      "desc_uz": "Kichik oila uchun qulay o‘ram.",
-      "desc_ru": "Удобная упаковка для небольшой семьи."
-    },
-    {
-      "id": "p4",
-      "name_uz": "Qo'ziqorinli chuchvara — 1 kg",
-      "name_ru": "Пельмени с грибами — 1 кг",
-      "price": 38000,
-      "image": "images/chuchvara_mushroom_1kg.jpg",
-      "desc_uz": "Tabiiy qoʻziqorinlar va maxsus ziravorlar bilan.",
-      "desc_ru": "С натуральными грибами и специальными приправами."
-    },
-    {
-      "id": "p5",
-      "name_uz": "Krem-sirli chuchvara — 1 kg",
-      "name_ru": "Пельмени с сыром — 1 кг",
-      "price": 39000,
-      "image": "images/chuchvara_cheese_1kg.jpg",
-      "desc_uz": "Ichida eritilgan krem-sir bilan boy taʼm.",
-      "desc_ru": "Богатый вкус с расплавленным крем-сыром внутри."
-    },
-    {
-      "id": "p6",
-      "name_uz": "Sabzavotli vegetarian chuchvara — 1 kg",
-      "name_ru": "Вегетарианские пельмени с овощами — 1 кг",
-      "price": 30000,
-      "image": "images/chuchvara_veggie_1kg.jpg",
-      "desc_uz": "Sabzavotlar bilan to‘ldirilgan, vegetarian uchun mos.",
-      "desc_ru": "С начинкой из овощей, подходит для вегетарианцев."
-    },
-    {
-      "id": "p7",
-      "name_uz": "Qizil baliqli chuchvara — 1 kg",
-      "name_ru": "Пельмени с лососем — 1 кг",
-      "price": 52000,
-      "image": "images/chuchvara_salmon_1kg.jpg",
-      "desc_uz": "Yuqori sifatli qizil baliqdan tayyorlangan.",
-      "desc_ru": "Приготовлены из высококачественного лосося."
-    },
-    {
-      "id": "p8",
-      "name_uz": "Achchiq qoʻy goʻshtli chuchvara — 1 kg",
-      "name_ru": "Острые пельмени со бараниной — 1 кг",
-      "price": 47000,
-      "image": "images/chuchvara_spicy_lamb_1kg.jpg",
-      "desc_uz": "Anʼanaviy ziravorlar bilan achchiq lazzat.",
-      "desc_ru": "Острый вкус с традиционными специями."
-    },
-    {
-      "id": "p9",
-      "name_uz": "Aralash toʻplam (3x500g) — sovg'a paketi",
-      "name_ru": "Сборный набор (3x500г) — подарочная упаковка",
-      "price": 82000,
-      "image": "images/chuchvara_mixed_pack_3x500g.jpg",
-      "desc_uz": "Turli xil taʼmlar: mol, tovuq va qoʻziqorin — oilaviy variant.",
-      "desc_ru": "Разные вкусы: говядина, курица и грибы — для семейного употребления."
-    }
-  ],
-  "orders": [],
-  "admins": [
-    {
-      "username": "admin",
-      "password": "12345"
-    }
-  ]
-}
-```
-
----
-
-## `templates/index.html`
-
-```html
-<!doctype html>
-<html>
-<head><meta charset="utf-8"><title>Menu</title></head>
-<body>
-  <h1>Menu</h1>
-  <ul>
-    {% for p in products %}
-      <li>
-        <a href="{{ url_for('order', product_id=p.id) }}">
-          {{ p['name_ru'] if lang=='ru' else p['name_uz'] }} — {{ p.price }} сум
-        </a>
-      </li>
-    {% endfor %}
-  </ul>
-</body>
-</html>
-```
-
----
-
-## `templates/order.html`
-
-```html
-<!doctype html>
-<html>
-<head><meta charset="utf-8"><title>Order</title></head>
-<body>
-  <h1>{{ product['name_ru'] if lang=='ru' else product['name_uz'] }}</h1>
-  <form method="post">
-    <input type="hidden" name="lang" value="{{ lang }}">
-    <label>Ism: <input name="name"></label><br>
-    <label>Tel: <input name="phone"></label><br>
-    <label>Soni: <input name="qty" value="1"></label><br>
-    <label>Izoh: <textarea name="note"></textarea></label><br>
-    <button type="submit">Buyurtma</button>
-  </form>
-</body>
-</html>
-```
-
----
-
-## `templates/ordered.html`
-
-```html
-<!doctype html>
-<html><head><meta charset="utf-8"><title>Ordered</title></head>
-<body>
-  <h1>Buyurtma qabul qilindi</h1>
-  <p>Buyurtma ID: {{ order.id }}</p>
-  <p>Mahsulot: {{ order.product_name }}</p>
-  <p>Soni: {{ order.qty }}</p>
-  <a href="{{ url_for('index') }}">Orqaga</a>
-</body></html>
-```
-
----
-
-## `templates/login.html`
-
-```html
-<!doctype html>
-<html><head><meta charset="utf-8"><title>Admin login</title></head>
-<body>
-  <h1>Admin login</h1>
-  {% if error %}<p style="color:red">{{ error }}</p>{% endif %}
-  <form method="post">
-    <label>Username: <input name="username"></label><br>
-    <label>Password: <input name="password" type="password"></label><br>
-    <button type="submit">Kirish</button>
-  </form>
-</body></html>
-```
-
----
-
-## `templates/admin.html`
-
-```html
-<!doctype html>
-<html><head><meta charset="utf-8"><title>Admin</title></head>
-<body>
-  <h1>Admin panel</h1>
-  <h2>Products</h2>
-  <ul>
-  {% for p in products %}
-    <li>{{ p.id }} - {{ p.name_ru }}</li>
-  {% endfor %}
-  </ul>
-  <h2>Orders</h2>
-  <ul>
-  {% for o in orders %}
-    <li>{{ o.id }} — {{ o.product_name }} — {{ o.name }}</li>
-  {% endfor %}
-  </ul>
-  <a href="{{ url_for('admin_logout') }}">Logout</a>
-</body></html>
-```
-
----
-
-## `.env.example`
-
-```
-BOT_TOKEN=
-ORDER_GROUP_ID=
-WEB_URL=
-SECRET_KEY=
-```
-
----
-
-## `README.md` (brief)
-
-```markdown
-# Altindan_bot — Flask + aiogram mini app
-
-Simple web shop + Telegram bot. Uses JSON file as DB.
-
-## Run locally
-1. Copy `.env.example` to `.env` and set your BOT_TOKEN and ORDER_GROUP_ID.
-2. `pip install -r requirements.txt`
-3. `python main.py`
-4. Open `http://127.0.0.1:5000`
-
-## Deploy (Render)
-- Add `runtime.txt` with `python-3.11.16`
-- Add `Procfile` and `requirements.txt`
-- In Render → Environment variables add `BOT_TOKEN` and `ORDER_GROUP_ID`
-```